@@ -7,24 +7,74 @@ import time
 from pathlib import Path
 import mido
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import tkinter as tk
 from PIL import Image, ImageTk
 from io import BytesIO
 import re
 import json
+import hashlib
+import functools
+import struct
+import sqlite3
+from contextlib import closing
 import tkinter.ttk as ttk
 import signal
+import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+try:
+    import fluidsynth # pyfluidsynth: optional in-process synth that keeps the soundfont loaded between tracks
+except ImportError:
+    fluidsynth = None
+from itertools import chain, islice
+
+# Chatty per-track/per-lookup lines are DEBUG, user-facing ones INFO; set MIDIPLAY_LOG=DEBUG to see everything
+log = logging.getLogger("midiplay")
 
 # --- Constants and Setup Functions (Keep previous versions) ---
 SOUNDFONT = "/usr/share/sounds/sf2/FluidR3_GM.sf2"
-IGDB_API_URL = "https://api.igdb.com/v4/games"
+IGDB_MULTIQUERY_URL = "https://api.igdb.com/v4/multiquery"
 BOX_ART_WIDTH = 640
+PROGRESS_TICK_MS = 100 # Progress bar refresh interval while a track plays
+PREPARE_RETRY_MS = 100 # Re-check interval while waiting on the prefetcher for the next track
+PREFETCH_FAILED = None # Queued by the prefetcher in place of a track when it dies
+ART_LOOKAHEAD = 4 # How many tracks ahead the box art prefetcher may run
+DURATION_WORKERS = 8 # Threads probing MIDI durations for each prefetch batch
+IGDB_BATCH_SIZE = 10 # Titles looked up per IGDB request (multiquery accepts at most 10 sub-queries)
 LIGHT_BLUE = "\033[1;94m"
 CYAN = "\033[36m"
 RESET = "\033[0m"
-
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "midiplay")
+FILE_LIST_CACHE = os.path.join(CACHE_DIR, "files.txt")
+IGDB_CACHE_DB = os.path.join(CACHE_DIR, "igdb.sqlite")
+DURATION_CACHE = os.path.join(CACHE_DIR, "durations.json")
+ART_CACHE_DIR = os.path.join(CACHE_DIR, "art") # Box art already resized for display, one PNG per image URL
+IGDB_CACHE_TTL = 30 * 86400 # Seconds a found image URL stays cached
+IGDB_MISS_TTL = 7 * 86400 # Seconds a "nothing found" answer stays cached
+
+# One pooled, keep-alive session for both api.igdb.com and images.igdb.com, shared by the UI and prefetch threads.
+# IGDB queries are read-only, so POSTs are safe to retry (429s honour Retry-After).
+SESSION = requests.Session()
+_adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=Retry(total=2, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504), allowed_methods=frozenset({"GET", "POST"})))
+SESSION.mount("https://", _adapter); SESSION.mount("http://", _adapter)
+
+# Opened once and shared by every timidity child for stdout and stderr. stderr used to be an unread PIPE,
+# which could stall timidity once the pipe buffer filled. No preexec_fn (start_new_session instead of os.setsid) keeps Popen on the fast vfork path.
+DEVNULL_FD = os.open(os.devnull, os.O_WRONLY)
+CHILD_PROCS = set() # Every timidity we started and haven't reaped yet; cleanup_processes() only touches these
+
+# Title guessing: "_"/"-" become spaces via a translate table; the rest uses precompiled patterns
+SEPARATOR_TRANS = str.maketrans("_-", "  ")
+PARENS_RE = re.compile(r"\([^)]*\)")
+MID_SUFFIX_RE = re.compile(r"\.mid$", re.I) # The scan matches .MID too, so the strip must be case-insensitive
+
+@functools.lru_cache(maxsize=1)
 def load_config():
     # ... (Keep existing load_config)
+    # Cached: config.json is read and parsed once per process, however many callers ask for it
     config_path = Path(__file__).parent / "config.json"
     try:
         with open(config_path) as f:
@@ -33,88 +83,263 @@ def load_config():
             access_token = config.get("access_token") or config.get("IGDB_ACCESS_TOKEN")
 
             if not client_id or not access_token:
-                print("⚠️ Warning: Missing IGDB credentials in config.json")
+                log.warning("⚠️ Warning: Missing IGDB credentials in config.json")
                 return None
 
             return {
                 "client_id": client_id,
                 "access_token": access_token,
                 "midi_dir": config.get("midi_dir") or config.get("MIDI_DIR", os.path.expanduser("~/Music")),
+                # Built once here rather than per request; passed per call so the token never goes to the image CDN
+                "igdb_headers": {"Client-ID": client_id, "Authorization": f"Bearer {access_token}"},
             }
     except FileNotFoundError:
-        print("⚠️ Error: config.json not found")
+        log.error("⚠️ Error: config.json not found")
         return None
     except json.JSONDecodeError:
-        print("⚠️ Error: config.json is not valid JSON")
+        log.error("⚠️ Error: config.json is not valid JSON")
         return None
 
+def iter_midi(root):
+    """Yields the path of every *.mid file under root (case-insensitive, symlinks skipped)."""
+    # os.scandir hands back cached d_type info, so no per-entry stat() like Path.rglob
+    stack = [root]
+    while stack:
+        d = stack.pop()
+        try:
+            with os.scandir(d) as it:
+                for e in it:
+                    if e.is_symlink(): continue # Links would only re-list files already reachable (or loop)
+                    if e.is_dir(follow_symlinks=False): stack.append(e.path)
+                    elif e.name[-4:].lower() == ".mid": yield e.path
+        except OSError as e:
+            log.warning("⚠️ Warning: Couldn't scan %s (%s)", d, e)
+
+def scan_library(root):
+    """Lists every MIDI file under root, walking each top-level folder on its own thread."""
+    midi_files, sub_dirs = [], []
+    with os.scandir(root) as it:
+        for e in it:
+            if e.is_symlink(): continue
+            if e.is_dir(follow_symlinks=False): sub_dirs.append(e.path)
+            elif e.name[-4:].lower() == ".mid": midi_files.append(e.path)
+
+    vgm_dirs = [d for d in sub_dirs if os.path.basename(d).startswith("VGM - ")]
+    if vgm_dirs:
+        log.info("📂 Found %s VGM directories.", len(vgm_dirs))
+    else:
+        log.warning("⚠️ No 'VGM - *' directories found directly under %s. Searching all subdirectories.", root)
+
+    # Directory reads are I/O bound and scandir releases the GIL, so the walks overlap
+    if sub_dirs:
+        with ThreadPoolExecutor(max_workers=min(32, len(sub_dirs))) as ex:
+            midi_files.extend(chain.from_iterable(ex.map(lambda d: list(iter_midi(d)), sub_dirs)))
+    return midi_files
+
+def cache_tmp_path(path):
+    """Scratch name for an atomic write of path, unique per writing thread so concurrent writers never share it."""
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+def write_cache_file(path, text):
+    """Atomically replaces a cache file (tmp file + os.replace) so a crash never leaves half a file."""
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = cache_tmp_path(path)
+        with open(tmp_path, "w", encoding="utf-8", errors="surrogateescape") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        log.warning("⚠️ Warning: Couldn't write cache %s (%s)", path, e)
+
+def dir_stamps(path):
+    """(path, mtime_ns) of each real subdirectory of path; unreadable folders just contribute nothing."""
+    try:
+        with os.scandir(path) as it:
+            return [(e.path, e.stat(follow_symlinks=False).st_mtime_ns) for e in it if e.is_dir(follow_symlinks=False)]
+    except OSError: return []
+
+def library_key(root):
+    """Fingerprints the library by the mtimes of the root, its top-level folders and the folders inside those."""
+    # A folder's mtime only moves when its direct children change: the root's covers .mid files dropped
+    # straight into it, a "VGM - *" folder's covers game folders added or removed, and each game folder's
+    # (one level further down) covers tracks added or removed inside it
+    top = dir_stamps(root)
+    stamps = sorted(f"{path}\t{mtime}" for path, mtime in chain(top, *(dir_stamps(path) for path, _ in top)))
+    return hashlib.sha1("\n".join([root, str(os.stat(root).st_mtime_ns), *stamps]).encode("utf-8", "surrogateescape")).hexdigest()
+
+def load_midi_files(root):
+    """Returns the cached file list when the library key still matches, otherwise rescans and re-caches.
+    The key only sees folders down to game-folder depth, so tracks added or renamed deeper than that
+    (e.g. "VGM - X/Game/Disc 1/") aren't noticed; run with MIDIPLAY_RESCAN=1 to force a fresh scan."""
+    key = library_key(root)
+    if os.environ.get("MIDIPLAY_RESCAN", "0") != "0":
+        log.info("🔄 MIDIPLAY_RESCAN set, ignoring the cached file list")
+    else:
+        try:
+            with open(FILE_LIST_CACHE, encoding="utf-8", errors="surrogateescape") as f:
+                lines = f.read().splitlines()
+            if lines and lines[0] == key:
+                log.info("⚡ Using cached file list from %s", FILE_LIST_CACHE)
+                return lines[1:]
+        except OSError:
+            pass
+
+    midi_files = scan_library(root)
+    # One path per line (key first): reading it back is a single read().splitlines()
+    write_cache_file(FILE_LIST_CACHE, "\n".join([key, *(f for f in midi_files if "\n" not in f)]))
+    return midi_files
+
 def check_setup():
     # ... (Keep existing check_setup, ensure it returns midi_files)
     if not os.path.isfile(SOUNDFONT):
-        print(f"❌ Error: SoundFont not found at {SOUNDFONT}")
+        log.error("❌ Error: SoundFont not found at %s", SOUNDFONT)
         exit(1)
 
     config = load_config()
     if not config:
-        print("⚠️ Skipping setup due to missing config")
+        log.error("⚠️ Skipping setup due to missing config")
         exit(1)
 
     midi_dir = Path(config["midi_dir"])
 
-    print(f"Checking MIDI dir: '{midi_dir}'")
-    print("Exists?", os.path.exists(midi_dir))
-    print("Is dir?", os.path.isdir(midi_dir))
-    print(f"🔍 Looking for MIDI files in: {midi_dir}")
-    print(f"🔍 Searching ALL subdirectories recursively for *.[mM][iI][dD] files...")
+    log.debug("Checking MIDI dir: '%s'", midi_dir)
+    log.debug("Exists? %s", os.path.exists(midi_dir))
+    log.debug("Is dir? %s", os.path.isdir(midi_dir))
+    log.info("🔍 Looking for MIDI files in: %s", midi_dir)
+    log.debug("🔍 Searching ALL subdirectories recursively for *.[mM][iI][dD] files...")
 
     if not midi_dir.exists():
-        print(f"❌ Error: MIDI directory not found at {midi_dir}")
+        log.error("❌ Error: MIDI directory not found at %s", midi_dir)
         exit(1)
 
-    print("🔍 Searching for MIDI files...")
-    vgm_dirs = list(midi_dir.glob("VGM - *"))
-    midi_files = list(midi_dir.rglob("*.[mM][iI][dD]"))
-    if vgm_dirs:
-        print(f"📂 Found {len(vgm_dirs)} VGM directories.")
-        for vgm_dir in vgm_dirs:
-            dir_files = list(vgm_dir.rglob("*.mid"))
-            midi_files.extend(dir_files)
-    else:
-        print(f"⚠️ No 'VGM - *' directories found directly under {midi_dir}. Searching all subdirectories.")
-        midi_files = list(midi_dir.rglob("*.mid"))
+    log.debug("🔍 Searching for MIDI files...")
+    midi_files = load_midi_files(str(midi_dir))
 
 
     if not midi_files:
-        print(f"❌ Error: No MIDI files found matching '*.[mM][iI][dD]' in {midi_dir} or its subdirectories")
+        log.error("❌ Error: No MIDI files found matching '*.[mM][iI][dD]' in %s or its subdirectories", midi_dir)
         exit(1)
 
-    print(f"✅ Found {len(midi_files)} total MIDI files matching pattern.")
-    random.shuffle(midi_files) # Shuffle here once
-    print(" Playlist shuffled.")
-    return midi_dir, config, midi_files
+    log.info("✅ Found %s total MIDI files matching pattern.", len(midi_files))
+    return midi_dir, config, midi_files, load_duration_cache()
+
+def shuffled_iter(items):
+    """Yields items in random order, doing one Fisher-Yates step per item (shuffles the list in place as it goes)."""
+    for i in range(len(items) - 1, -1, -1):
+        j = random.randrange(i + 1)
+        items[i], items[j] = items[j], items[i]
+        yield items[i]
+
+# Data bytes that follow each channel-message status nibble (0x8n..0xEn)
+CHANNEL_DATA_LEN = {0x8: 2, 0x9: 2, 0xA: 2, 0xB: 2, 0xC: 1, 0xD: 1, 0xE: 2}
+
+def read_vlq(data, pos):
+    """Decodes a MIDI variable-length quantity at pos, returning (value, next_pos)."""
+    value = 0
+    while True:
+        b = data[pos]; pos += 1
+        value = (value << 7) | (b & 0x7F)
+        if b < 0x80: return value, pos
+
+def fast_duration(file_path):
+    """Computes a MIDI file's length in seconds from the raw track chunks.
+
+    Only delta times and set_tempo (FF 51 03) events are decoded; everything else is
+    skipped by length, so no mido Message objects get built. Raises ValueError on
+    anything it doesn't handle (SMPTE timing, format 2, stray system bytes).
+    """
+    with open(file_path, "rb") as f:
+        data = f.read()
+    chunk_id, header_len, midi_format, _ntracks, division = struct.unpack_from(">4sIHHH", data)
+    if chunk_id != b"MThd" or midi_format == 2 or division & 0x8000 or not division:
+        raise ValueError("unsupported MIDI header")
+
+    tempos = [] # (absolute tick, microseconds per beat) from every track
+    end_tick = 0
+    pos = 8 + header_len
+    while pos + 8 <= len(data):
+        chunk_id, length = struct.unpack_from(">4sI", data, pos); pos += 8
+        end = min(pos + length, len(data))
+        if chunk_id == b"MTrk":
+            tick, i, status = 0, pos, 0
+            while i < end:
+                delta, i = read_vlq(data, i); tick += delta
+                b = data[i]
+                if b >= 0x80:
+                    i += 1
+                    if b == 0xFF: # Meta event: type, length, payload
+                        meta_type = data[i]; size, i = read_vlq(data, i + 1)
+                        if meta_type == 0x51 and size == 3: tempos.append((tick, int.from_bytes(data[i:i + 3], "big")))
+                        i += size
+                        if meta_type == 0x2F: break # End of track
+                        continue
+                    if b in (0xF0, 0xF7): # SysEx: length, payload
+                        size, i = read_vlq(data, i); i += size
+                        continue
+                    if b >= 0xF0: raise ValueError(f"unexpected status byte {b:#x}")
+                    status = b
+                elif not status:
+                    raise ValueError("running status without a status byte")
+                i += CHANNEL_DATA_LEN[status >> 4]
+            end_tick = max(end_tick, tick)
+        pos += length
+
+    # Walk the merged tempo map up to the last tick of the longest track
+    seconds, last_tick, tempo = 0.0, 0, 500000
+    for tick, new_tempo in sorted(tempos, key=lambda t: t[0]):
+        if tick >= end_tick: break
+        seconds += (tick - last_tick) * tempo / (division * 1_000_000)
+        last_tick, tempo = tick, new_tempo
+    return seconds + (end_tick - last_tick) * tempo / (division * 1_000_000)
+
+def manual_duration(mid):
+    """Fallback length for a parsed MidiFile: one pass over the merged tracks, converting each delta at the
+    tempo in force at that point so mid-song tempo changes are timed correctly."""
+    tempo = 500000; ticks_per_beat = mid.ticks_per_beat or 480; seconds = 0.0
+    for msg in mido.merge_tracks(mid.tracks):
+        if msg.time: seconds += mido.tick2second(msg.time, ticks_per_beat, tempo)
+        if msg.type == 'set_tempo': tempo = msg.tempo
+    return seconds
+
+def load_duration_cache():
+    """Loads {path: [mtime_ns, size, seconds]} saved by earlier runs (empty if missing or unreadable)."""
+    try:
+        with open(DURATION_CACHE, encoding="utf-8") as f:
+            cache = json.load(f)
+        return cache if isinstance(cache, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+def save_duration_cache(cache):
+    write_cache_file(DURATION_CACHE, json.dumps(cache, separators=(",", ":")))
+
+def get_duration(file_path, cache=None):
+    """Track length in seconds, answered from cache when the file's mtime and size are unchanged."""
+    if cache is None: return measure_duration(file_path)
+    try: st = os.stat(file_path)
+    except OSError: return measure_duration(file_path)
+    entry = cache.get(file_path)
+    if entry and entry[0] == st.st_mtime_ns and entry[1] == st.st_size: return entry[2]
+    seconds = measure_duration(file_path)
+    cache[file_path] = [st.st_mtime_ns, st.st_size, seconds]
+    return seconds
+
+def measure_duration(file_path):
+    try:
+        seconds = fast_duration(file_path)
+        if seconds > 0:
+            return int(seconds)
+    except (OSError, ValueError, IndexError, struct.error):
+        pass # Odd or damaged file, let mido have a go below
 
-def get_duration(file_path):
-    # ... (Keep existing get_duration)
     try:
         mid = mido.MidiFile(file_path)
-        if mid.length > 0:
-            return int(mid.length)
-        # Fallback calculation (simplified)
-        total_time = sum(msg.time for track in mid.tracks for msg in track if not msg.is_meta)
-        tempo = 500000
-        ticks_per_beat = mid.ticks_per_beat if mid.ticks_per_beat else 480
-        for track in mid.tracks:
-             for msg in track:
-                 if msg.type == 'set_tempo':
-                     tempo = msg.tempo
-                     break
-             else: continue
-             break
-        seconds = mido.tick2second(total_time, ticks_per_beat, tempo)
-        return int(seconds)
+        try: seconds = mid.length
+        except ValueError: seconds = 0 # mido refuses type 2 (asynchronous) files
+        return int(seconds or manual_duration(mid))
 
     except Exception as e:
-        print(f"⚠️ Warning: Couldn't determine duration for {file_path}, defaulting to 120s ({e})")
+        log.warning("⚠️ Warning: Couldn't determine duration for %s, defaulting to 120s (%s)", file_path, e)
         return 120
 
 # --- GameDisplay Class (largely same as previous Play/Stop version) ---
@@ -151,12 +376,46 @@ class GameDisplay:
 
         self._is_process_running = False # Internal state if timidity should be running
         self.process = None
+        # With pyfluidsynth installed, tracks are synthesized in-process by one long-lived Synth
+        # (soundfont parsed once per session) instead of a fresh timidity per track
+        self.synth = None
+        self._worker_thread = None
+        self._stop_event = threading.Event()
+        if fluidsynth:
+            try:
+                self.synth = fluidsynth.Synth(); self.synth.start(driver="alsa")
+                self.synth.sfload(SOUNDFONT, update_midi_preset=1)
+                log.info("🎹 Using in-process FluidSynth for playback.")
+            except Exception as e:
+                log.warning("⚠️ FluidSynth unavailable (%s), falling back to timidity.", e); self.synth = None
         self.current_file_path = None
+        self.current_name = None
+        self._total_time = None; self._total_time_str = "0:00" # Track length only changes per track, so format it once
+        self._last_sec = self._last_percent = None # What the time label / progress bar currently show
+        self._art_generation = 0 # Bumped per update_display() so late-arriving art for an old track is dropped
         self.on_close_callback = on_close_callback
         self.play_stop_callback = play_stop_callback
 
         self.window.protocol("WM_DELETE_WINDOW", self.on_window_close)
 
+        # Other threads hand UI work to the Tk thread through this queue (Tk itself isn't thread-safe)
+        # and each post() wakes the Tk thread with a virtual event, so nothing polls while the player sits idle
+        self.ui_queue = queue.Queue()
+        self.window.bind("<<UiPost>>", self.drain_ui_queue)
+
+    def post(self, func, *args):
+        """Schedules func(*args) to run on the Tk thread; safe to call from any thread."""
+        self.ui_queue.put((func, args))
+        try: self.window.event_generate("<<UiPost>>", when="tail")
+        except tk.TclError: pass # Window already destroyed: nothing left to update
+
+    def drain_ui_queue(self, event=None):
+        while True:
+            try: func, args = self.ui_queue.get_nowait()
+            except queue.Empty: break
+            try: func(*args)
+            except Exception as e: log.warning("⚠️ UI update failed: %s", e)
+
     def handle_play_stop_click(self):
         if self.play_stop_callback:
             # Pass internal state: is a process supposed to be running?
@@ -174,253 +433,409 @@ class GameDisplay:
             self.play_stop_button.config(text="Play", state=tk.DISABLED)
             self._is_process_running = False
         else:
-            print(f"Warning: Invalid button state requested: {state}")
+            log.warning("Warning: Invalid button state requested: %s", state)
 
-    def start_playback_process(self, file_path):
-        if self.process and self.process.poll() is None:
-            print("Warning: Start called when process already running. Stopping first.")
+    def start_playback_process(self, file_path, name=None, on_finished=None):
+        """Launches timidity for file_path; on_finished (if given) is run on the Tk thread once the process exits."""
+        if (self.process and self.process.poll() is None) or (self._worker_thread and self._worker_thread.is_alive()):
+            log.warning("Warning: Start called when process already running. Stopping first.")
             self.stop_playback_process()
 
         self.current_file_path = file_path
+        self.current_name = name or os.path.basename(file_path) # Callers usually have it already
+        if self.synth:
+            self._stop_event = threading.Event()
+            self._worker_thread = threading.Thread(target=self._play_in_process, args=(file_path, on_finished, self._stop_event), daemon=True)
+            self._worker_thread.start()
+            log.info("🚀 Started in-process playback for: %s", self.current_name)
+            self._is_process_running = True; return True
         cmd = ["timidity", "-x", f"soundfont {SOUNDFONT}", "-o", "alsa", "-s", "44100", "-B2,8", self.current_file_path]
         try:
-            self.process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
-            print(f"🚀 Started timidity process for: {os.path.basename(self.current_file_path)}")
+            self.process = subprocess.Popen(cmd, stdout=DEVNULL_FD, stderr=DEVNULL_FD, close_fds=True, start_new_session=True); CHILD_PROCS.add(self.process)
+            log.info("🚀 Started timidity process for: %s", self.current_name)
             self._is_process_running = True # Mark process as active internally
+            if on_finished:
+                # Let the OS tell us when timidity exits instead of polling it
+                process = self.process
+                threading.Thread(target=lambda: (process.wait(), CHILD_PROCS.discard(process), self.post(on_finished)), daemon=True).start()
             return True
         except FileNotFoundError:
-             print("❌ Error: 'timidity' command not found.")
+             log.error("❌ Error: 'timidity' command not found.")
              self.process = None; self._is_process_running = False; return False
         except Exception as e:
-            print(f"❌ Error starting timidity: {e}")
+            log.error("❌ Error starting timidity: %s", e)
             self.process = None; self._is_process_running = False; return False
 
+    def _play_in_process(self, file_path, on_finished, stop_event):
+        """Worker thread: feeds a MIDI file's messages to the synth in real time until it ends or stop_event is set."""
+        synth = self.synth
+        try:
+            start = time.monotonic(); offset = 0.0
+            for msg in mido.MidiFile(file_path):
+                offset += msg.time
+                # Sleeping on the event means a stop request interrupts even a long rest immediately
+                if stop_event.wait(max(0.0, start + offset - time.monotonic())): break
+                if msg.type == 'note_on': synth.noteon(msg.channel, msg.note, msg.velocity)
+                elif msg.type == 'note_off': synth.noteoff(msg.channel, msg.note)
+                elif msg.type == 'control_change': synth.cc(msg.channel, msg.control, msg.value)
+                elif msg.type == 'program_change': synth.program_change(msg.channel, msg.program)
+                elif msg.type == 'pitchwheel': synth.pitch_bend(msg.channel, msg.pitch)
+        except Exception as e:
+            log.error("❌ Error during in-process playback of %s: %s", os.path.basename(file_path), e)
+        finally:
+            synth.system_reset() # Silences any notes left hanging by a stop mid-phrase
+        if on_finished and not stop_event.is_set(): self.post(on_finished)
+
     def stop_playback_process(self):
         stopped = False
+        if self._worker_thread and self._worker_thread.is_alive():
+            log.info("⏹️ Stopping in-process playback for: %s", self.current_name or 'Unknown')
+            stopped = True
+            self._stop_event.set(); self._worker_thread.join(timeout=1.0)
+        self._worker_thread = None
         if self.process and self.process.poll() is None:
-            print(f"⏹️ Stopping timidity process for: {os.path.basename(self.current_file_path or 'Unknown')}")
+            log.info("⏹️ Stopping timidity process for: %s", self.current_name or 'Unknown')
             stopped = True
             try:
-                self.process.terminate()
-                try: self.process.wait(timeout=0.5)
+                # timidity leads its own session (start_new_session), so one killpg reaches it and any helpers at once
+                os.killpg(self.process.pid, signal.SIGTERM)
+                try: self.process.wait(timeout=0.1)
                 except subprocess.TimeoutExpired:
-                    print("⏳ Timidity didn't terminate gracefully, sending SIGKILL.")
-                    self.process.kill(); self.process.wait()
-            except ProcessLookupError: print("🤔 Process already finished.")
-            except Exception as e: print(f"⚠️ Error stopping timidity: {e}")
-            self.process = None
+                    log.warning("⏳ Timidity didn't terminate gracefully, sending SIGKILL.")
+                    os.killpg(self.process.pid, signal.SIGKILL); self.process.wait()
+            except ProcessLookupError: log.debug("🤔 Process already finished.")
+            except Exception as e: log.warning("⚠️ Error stopping timidity: %s", e)
+        if self.process and self.process.returncode is not None: CHILD_PROCS.discard(self.process)
+        self.process = None
         self._is_process_running = False # Mark process as inactive internally
         return stopped # Return True if a running process was actually stopped
 
     def update_display(self, image_url, title):
         # ... (Keep existing update_display)
+        # Fetching/decoding happens on a worker thread; only the PhotoImage is built here on the Tk thread
         self.title_label.configure(text=title or "---")
-        try:
-            if image_url:
-                response = requests.get(image_url, timeout=10); response.raise_for_status()
-                img = Image.open(BytesIO(response.content)); img.thumbnail((BOX_ART_WIDTH, BOX_ART_WIDTH))
-                photo = ImageTk.PhotoImage(img)
-                self.image_label.configure(image=photo); self.image_label.image = photo
-            else: self.image_label.configure(image=""); self.image_label.image = None
-        except requests.exceptions.RequestException as e: print(f"⚠️ Img DL Error: {e}"); self.image_label.configure(image=""); self.image_label.image = None
-        except Exception as e: print(f"⚠️ Img Load Error: {e}"); self.image_label.configure(image=""); self.image_label.image = None
+        self._art_generation += 1 # Any load still in flight for the previous track is now stale
+        if image_url:
+            threading.Thread(target=self._load_art, args=(image_url, self._art_generation), daemon=True).start()
+        else: self._show_art(None, self._art_generation)
+
+    def _load_art(self, image_url, generation):
+        """Worker thread: decodes (and on a cache miss downloads/resizes) box art, then hands it to the Tk thread."""
+        img = None
+        try: img = load_box_art(image_url); img.load() # Force the decode here, not lazily inside PhotoImage
+        except requests.exceptions.RequestException as e: log.warning("⚠️ Img DL Error: %s", e)
+        except Exception as e: log.warning("⚠️ Img Load Error: %s", e)
+        self.post(self._show_art, img, generation)
+
+    def _show_art(self, img, generation):
+        if generation != self._art_generation: return # The track changed while this image was loading
+        photo = ImageTk.PhotoImage(img) if img else None
+        self.image_label.configure(image=photo or ""); self.image_label.image = photo
 
     def update_progress(self, current, total):
         # ... (Keep existing update_progress)
-        if total > 0: progress_percent = min(100, (current / total) * 100); self.progress_var.set(progress_percent)
-        else: self.progress_var.set(0)
-        current_time_str = f"{int(current // 60)}:{int(current % 60):02d}"
-        total_time_str = f"{int(total // 60)}:{int(total % 60):02d}"
-        self.time_label.configure(text=f"{current_time_str} / {total_time_str}")
+        # Called every PROGRESS_TICK_MS, but only touch the widgets when what they show actually changes
+        percent = min(100, int(current * 100 / total)) if total > 0 else 0
+        if percent != self._last_percent: self._last_percent = percent; self.progress_var.set(percent)
+        second = int(current)
+        if total != self._total_time:
+            self._total_time = total; self._total_time_str = f"{int(total // 60)}:{int(total % 60):02d}"; self._last_sec = None
+        if second != self._last_sec:
+            self._last_sec = second; self.time_label.configure(text=f"{second // 60}:{second % 60:02d} / {self._total_time_str}")
 
     def on_window_close(self):
-        print("🚪 Window close requested...")
+        log.info("🚪 Window close requested...")
         self.stop_playback_process()
         if self.on_close_callback:
             self.on_close_callback()
 
-# --- get_igdb_box_art, cleanup_processes (Keep previous versions) ---
-def get_igdb_box_art(config, game_name_from_path):
-    # ... (Keep existing get_igdb_box_art)
-    if not config: return None
-    base_name = os.path.basename(game_name_from_path); search_query = re.sub(r"\.mid$", "", base_name); search_query = re.sub(r"[_-]", " ", search_query)
-    path_parts = Path(game_name_from_path).parts; game_title_guess = ""
-    if len(path_parts) > 1: parent_folder = path_parts[-2];
-    if "vgm -" not in parent_folder.lower(): game_title_guess = parent_folder
-    if not game_title_guess: game_title_guess = search_query
-    game_title_guess = re.sub(r'\([^)]*\)', '', game_title_guess).strip(); game_title_guess = re.sub(r'\s+-\s+.*$', '', game_title_guess).strip()
-    if len(game_title_guess) > 2: search_query = game_title_guess
-    print(f"🎮 Guessing game title: '{search_query}'")
-    headers = {"Client-ID": config["client_id"], "Authorization": f'Bearer {config["access_token"]}'}; game_data = f'search "{search_query}"; fields name, cover.url, screenshots.url, artworks.url; limit 1;'
+def art_cache_path(image_url): return os.path.join(ART_CACHE_DIR, hashlib.sha1(image_url.encode()).hexdigest() + ".png")
+
+def load_box_art(image_url):
+    """Returns the display-sized box art for a URL, downloading and resizing it only the first time it is seen."""
+    path = art_cache_path(image_url)
+    try: return Image.open(path)
+    except OSError: pass # Not cached yet (or unreadable): fetch it again
+    response = SESSION.get(image_url, timeout=10)
+    response.raise_for_status()
+    img = Image.open(BytesIO(response.content)) # Pillow needs a seekable file, so the body is buffered either way
+    # draft() lets libjpeg decode straight at 1/2..1/8 scale before the final resize; for PNGs, which it
+    # can't help, reducing_gap does a cheap integer reduce() first so BILINEAR only sees a small image
+    img.draft("RGB", (BOX_ART_WIDTH, BOX_ART_WIDTH)); img.load()
+    if max(img.size) > BOX_ART_WIDTH: img.thumbnail((BOX_ART_WIDTH, BOX_ART_WIDTH), Image.Resampling.BILINEAR, reducing_gap=2.0)
+    try:
+        os.makedirs(ART_CACHE_DIR, exist_ok=True)
+        tmp_path = cache_tmp_path(path); img.save(tmp_path, "PNG"); os.replace(tmp_path, path)
+    except OSError as e: log.debug("Could not cache box art %s: %s", image_url, e)
+    return img
+
+def open_igdb_cache():
+    """Opens (creating if needed) the IGDB lookup cache; one short-lived connection per call keeps it thread-safe."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    db = sqlite3.connect(IGDB_CACHE_DB)
+    db.execute("CREATE TABLE IF NOT EXISTS art (key TEXT PRIMARY KEY, url TEXT, ts REAL NOT NULL)")
+    return db
+
+def igdb_cache_get(key):
+    """Returns (hit, url). A hit with url None is a remembered "not found"."""
+    try:
+        with closing(open_igdb_cache()) as db:
+            row = db.execute("SELECT url, ts FROM art WHERE key = ?", (key,)).fetchone()
+    except (sqlite3.Error, OSError) as e: # OSError: the cache dir itself can't be created (read-only home, etc.)
+        log.warning("⚠️ IGDB cache read failed: %s", e); return False, None
+    if row and row[1] > time.time() - (IGDB_CACHE_TTL if row[0] else IGDB_MISS_TTL):
+        return True, row[0]
+    return False, None
+
+def igdb_cache_put(key, url):
     try:
-        response = requests.post(IGDB_API_URL, headers=headers, data=game_data, timeout=10); response.raise_for_status()
-        games = response.json()
-        if games:
-            game = games[0]; print(f"✅ Found IGDB game: {game.get('name', 'Unknown')}"); image_info = None; size = None
-            if "cover" in game and game["cover"]: image_info, size = game["cover"], "t_cover_big"
-            elif "screenshots" in game and game["screenshots"]: image_info, size = game["screenshots"][0], "t_screenshot_huge"
-            elif "artworks" in game and game["artworks"]: image_info, size = game["artworks"][0], "t_screenshot_huge"
-            if image_info and "url" in image_info:
-                url = image_info["url"];
-                if url.startswith("//"): url = "https:" + url
-                url = url.replace("t_thumb", size); print(f"📸 Using image URL: {url}"); return url
-            else: print(" GDB game found, but no suitable image URL.")
-        else: print(f"❌ No games found on IGDB matching '{search_query}'")
-    except requests.exceptions.Timeout: print("⚠️ IGDB request timed out.")
-    except requests.exceptions.RequestException as e: print(f"⚠️ Network error fetching from IGDB: {e}")
-    except json.JSONDecodeError: print(f"⚠️ Failed to decode IGDB response.")
-    except Exception as e: print(f"⚠️ Unexpected error fetching game images: {e}")
+        with closing(open_igdb_cache()) as db, db:
+            db.execute("INSERT OR REPLACE INTO art (key, url, ts) VALUES (?, ?, ?)", (key, url, time.time()))
+    except (sqlite3.Error, OSError) as e:
+        log.warning("⚠️ IGDB cache write failed: %s", e)
+
+def guess_search_query(game_name_from_path):
+    """Turns a MIDI path into the game title to search IGDB for (parent folder, else file name)."""
+    # Module-level compiled patterns plus C-level str.translate/partition; nothing is compiled or cache-looked-up per call
+    parent_dir, base_name = os.path.split(game_name_from_path); parent_folder = os.path.basename(parent_dir)
+    search_query = MID_SUFFIX_RE.sub('', base_name).translate(SEPARATOR_TRANS)
+    game_title_guess = parent_folder if parent_folder and "vgm -" not in parent_folder.lower() else search_query
+    game_title_guess = PARENS_RE.sub('', game_title_guess).partition(" - ")[0].strip()
+    if len(game_title_guess) > 2: search_query = game_title_guess
+    return search_query
+
+def igdb_cache_key(search_query): return " ".join(search_query.lower().split())
+
+def igdb_quote(text): return text.replace("\\", "\\\\").replace('"', '\\"') # Escape for an Apicalypse string literal
+
+def pick_igdb_image_url(game):
+    """Best image URL for an IGDB game record (cover, then screenshot, then artwork), or None."""
+    # Ask IGDB for the smallest rendition that still fills BOX_ART_WIDTH: covers 528x748, screenshots/artworks
+    # 889x500 (t_screenshot_huge was a 1280x720 download only to be shrunk again)
+    image_info = None; size = None
+    if "cover" in game and game["cover"]: image_info, size = game["cover"], "t_cover_big_2x"
+    elif "screenshots" in game and game["screenshots"]: image_info, size = game["screenshots"][0], "t_screenshot_big"
+    elif "artworks" in game and game["artworks"]: image_info, size = game["artworks"][0], "t_screenshot_big"
+    if image_info and "url" in image_info:
+        url = image_info["url"]
+        if url.startswith("//"): url = "https:" + url
+        return url.replace("t_thumb", size)
     return None
 
+def get_igdb_box_art_batch(config, paths):
+    """Resolves box art URLs for several tracks with at most one IGDB request; returns one URL (or None) per path."""
+    if not config: return [None] * len(paths)
+    queries = [guess_search_query(p) for p in paths]
+    urls = {}; pending = {}
+    for search_query in queries:
+        key = igdb_cache_key(search_query)
+        if key in urls or key in pending: continue
+        cached, url = igdb_cache_get(key)
+        if cached: log.debug("📦 Cached IGDB result for '%s': %s", search_query, url or 'no image'); urls[key] = url
+        else: pending[key] = search_query
+
+    if pending:
+        log.debug("🎮 Looking up %s game title(s) on IGDB: %s", len(pending), ', '.join(repr(q) for q in pending.values()))
+        # One named sub-query per title, each the same "search ...; limit 1;" a single lookup would send,
+        # so every title gets IGDB's own relevance ranking and its result comes back under its index
+        keys = list(pending)
+        game_data = "".join(f'query games "{i}" {{ search "{igdb_quote(pending[key])}"; fields name, cover.url, screenshots.url, artworks.url; limit 1; }};'
+                            for i, key in enumerate(keys))
+        try:
+            response = SESSION.post(IGDB_MULTIQUERY_URL, headers=config["igdb_headers"], data=game_data, timeout=10); response.raise_for_status()
+            results = {r.get("name"): r.get("result") or [] for r in response.json()}
+            for i, key in enumerate(keys):
+                search_query = pending[key]; games = results.get(str(i))
+                if games is None: continue # Sub-query missing from the reply: leave uncached and retry next time
+                if games:
+                    game = games[0]; url = pick_igdb_image_url(game)
+                    log.debug("✅ Found IGDB game for '%s': %s (%s)", search_query, game.get('name', 'Unknown'), url or 'no suitable image URL')
+                    urls[key] = url; igdb_cache_put(key, url)
+                else:
+                    log.debug("❌ No games found on IGDB matching '%s'", search_query)
+                    igdb_cache_put(key, None) # Remember misses so broken titles aren't re-queried every run
+        except requests.exceptions.Timeout: log.warning("⚠️ IGDB request timed out.")
+        except requests.exceptions.RequestException as e: log.warning("⚠️ Network error fetching from IGDB: %s", e)
+        except json.JSONDecodeError: log.warning("⚠️ Failed to decode IGDB response.")
+        except Exception as e: log.warning("⚠️ Unexpected error fetching game images: %s", e)
+    return [urls.get(igdb_cache_key(q)) for q in queries]
+
+def warm_box_art(image_url):
+    """Fetches box art into the disk cache ahead of time; failures are left for update_display() to report."""
+    try: load_box_art(image_url)
+    except Exception as e: log.debug("Box art prefetch failed for %s: %s", image_url, e)
+
+def prefetch_tracks(config, tracks, track_queue, duration_cache):
+    """Pulls tracks off the (lazy) playlist on a background thread and queues (path, box_art_url, duration)
+    in play order. Each batch's durations are probed on a small thread pool while its IGDB_BATCH_SIZE titles
+    are looked up in one request, so disk and network waits overlap. The art itself is downloaded into the
+    disk cache here too, so by the time a track comes up update_display() only has to read a local PNG."""
+    tracks = iter(tracks)
+    try:
+        with ThreadPoolExecutor(max_workers=DURATION_WORKERS) as pool:
+            while batch := list(islice(tracks, IGDB_BATCH_SIZE)):
+                durations = pool.map(lambda path: get_duration(path, duration_cache), batch) # Starts right away
+                urls = get_igdb_box_art_batch(config, batch)
+                # One download per distinct URL: a batch is usually several tracks from the same game folder
+                art = {url: pool.submit(warm_box_art, url) for url in set(urls) if url}
+                for path, url, duration in zip(batch, urls, durations):
+                    if url: art[url].result()
+                    track_queue.put((path, url, duration)) # Blocks while the queue is full
+    except Exception:
+        # Otherwise prepare_track() would keep polling an empty queue forever with nothing on screen
+        log.exception("❌ Track prefetcher failed")
+        track_queue.put(PREFETCH_FAILED)
+
 def cleanup_processes():
     # ... (Keep existing cleanup_processes)
-    print("\n🧹 Cleaning up any remaining timidity processes...")
-    try:
-        subprocess.run(["pkill", "-15", "timidity"], capture_output=True, text=True, check=False); time.sleep(0.2)
-        subprocess.run(["pkill", "-9", "timidity"], capture_output=True, text=True, check=False); print("🧹 Cleanup complete.")
-    except FileNotFoundError: print("⚠️ 'pkill' command not found.")
-    except Exception as e: print(f"⚠️ Error during cleanup: {e}")
+    # Only our own children: no pkill fork/execs, no fixed sleep, and other users' timidity is left alone
+    log.info("🧹 Cleaning up any remaining timidity processes...")
+    procs = [p for p in list(CHILD_PROCS) if p.poll() is None]; CHILD_PROCS.clear()
+    for p in procs:
+        try: os.killpg(p.pid, signal.SIGTERM)
+        except ProcessLookupError: pass
+    deadline = time.monotonic() + 0.2
+    for p in procs:
+        try: p.wait(timeout=max(0.0, deadline - time.monotonic())) # Reaps it; returns as soon as it exits
+        except subprocess.TimeoutExpired:
+            log.warning("⏳ Timidity (pid %s) ignored SIGTERM, sending SIGKILL.", p.pid)
+            try: os.killpg(p.pid, signal.SIGKILL)
+            except ProcessLookupError: pass
+            p.wait()
+    log.info("🧹 Cleanup complete.")
 
 # --- Main Application Logic ---
 # --- Main Application Logic ---
 def main():
-    # (Initial setup: check_setup, shuffle midi_files, state variables, callbacks...)
-    midi_dir, config, midi_files = check_setup()
+    # (Initial setup: check_setup, state variables, callbacks, shuffled track queue...)
+    midi_dir, config, midi_files, duration_cache = check_setup()
     if not midi_files: exit(1)
 
+    # Everything below runs on the Tk thread as callbacks: button presses, progress ticks and
+    # end-of-track notifications drive the state machine, and mainloop() is the only loop.
     current_index = 0
-    main_window_closed = False
+    current_track = None # (file_path, box_art_url, duration) for current_index, once the prefetcher delivered it
     continuous_play_enabled = False
-    start_playback_requested = False
-    stop_playback_requested = False
+    playback_token = 0 # Bumped whenever playback starts or stops, so stale end-of-track callbacks are ignored
+    start_time = end_time = 0.0
+    base_name = None # File name of current_track, split off its path once per track
+
+    def prepare_track():
+        nonlocal current_track, base_name
+        if current_track is None:
+            try: current_track = track_queue.get_nowait()
+            except queue.Empty: # Prefetcher hasn't caught up yet (first track, or a slow IGDB batch)
+                display.window.after(PREPARE_RETRY_MS, prepare_track); return
+            if current_track is PREFETCH_FAILED:
+                display.update_display(None, "Couldn't load the next track (see log)"); display.set_button_state("Disabled"); return
+        file_path, box_art_url, duration = current_track
+        base_name = file_path.rpartition(os.sep)[2] # Paths are plain strs from scandir; no posixpath.split needed
+
+        print(f"\n[{current_index + 1}/{len(midi_files)}] Preparing: {LIGHT_BLUE}{base_name}{RESET}")
+
+        # 1. Set title and box art (cleared when there is none), reset progress
+        display.update_display(box_art_url, base_name)
+        display.update_progress(0, duration)
+
+        # 2. Either play straight away or wait for the Play button
+        if continuous_play_enabled:
+            start_track()
+        else:
+            display.set_button_state("Play")
+            log.info("Continuous play OFF. Waiting for Play command...")
+
+    def start_track():
+        nonlocal continuous_play_enabled, playback_token, start_time, end_time
+        file_path, _, duration = current_track
+        log.debug("Attempting to start: %s", base_name)
+        playback_token += 1
+        success = display.start_playback_process(file_path, base_name, on_finished=functools.partial(on_track_end, playback_token, "Process ended."))
+        if not success:
+            log.error("❌ Failed to start %s. Stopping continuous play.", base_name)
+            continuous_play_enabled = False # Turn off on error
+            display.set_button_state("Play")
+            advance_track() # Skip failed track
+            return
+
+        display.set_button_state("Stop") # Ensure button is Stop
+        start_time = time.monotonic(); end_time = start_time + duration
+        log.debug("Playback active. Monitoring...")
+        progress_tick(playback_token)
+
+    def progress_tick(token):
+        if token != playback_token: return # Track was stopped or replaced since this tick was scheduled
+        now = time.monotonic()
+        if now >= end_time: on_track_end(token, "Duration reached."); return
+        display.update_progress(now - start_time, current_track[2])
+        display.window.after(min(PROGRESS_TICK_MS, int((end_time - now) * 1000) + 1), progress_tick, token)
+
+    def on_track_end(token, reason):
+        nonlocal playback_token
+        if token != playback_token: return
+        playback_token += 1
+        log.debug(reason)
+        display.stop_playback_process() # No-op if timidity already exited
+        log.debug("Song finished naturally.")
+        advance_track()
+
+    def advance_track():
+        nonlocal current_index, current_track, continuous_play_enabled
+        current_index += 1; current_track = None
+        if current_index >= len(midi_files):
+            # (Handle playlist end... the window stays up until the user closes it)
+            log.info("Playlist finished.")
+            continuous_play_enabled = False; display.set_button_state("Disabled")
+            display.update_display(None, "Playlist Finished"); display.update_progress(0, 0); display.time_label.configure(text="")
+            return
+        if continuous_play_enabled:
+            log.debug("Continuous play ON. Moving to track %s", current_index + 1)
+            display.set_button_state("Stop") # Ready for next track
+        else:
+            log.debug("Continuous play OFF. Ready for next track (requires Play).")
+        prepare_track()
+
+    def on_main_window_close():
+        nonlocal playback_token
+        log.debug("Main window close requested.")
+        playback_token += 1
+        display.window.quit()
 
-    def on_main_window_close(): nonlocal main_window_closed; print("Main window close requested."); main_window_closed = True
     def handle_play_stop_action(is_process_running):
-        nonlocal continuous_play_enabled, start_playback_requested, stop_playback_requested
-        if is_process_running: print("⏹️ Stop pressed."); continuous_play_enabled = False; stop_playback_requested = True
-        else: print("▶️ Play pressed."); continuous_play_enabled = True; start_playback_requested = True
+        nonlocal continuous_play_enabled, playback_token
+        if is_process_running:
+            log.info("⏹️ Stop pressed."); continuous_play_enabled = False
+            playback_token += 1
+            display.stop_playback_process()
+            log.info("Playback stopped by user command.")
+            display.set_button_state("Play")
+            if current_track: display.update_progress(0, current_track[2]) # Stay on current track
+        else:
+            log.info("▶️ Play pressed."); continuous_play_enabled = True
+            if current_track: start_track() # Otherwise prepare_track() starts it once it arrives
 
     display = GameDisplay(on_close_callback=on_main_window_close, play_stop_callback=handle_play_stop_action)
     display.set_button_state("Play")
 
+    # The playlist is shuffled lazily and walked by the prefetch thread, which runs the IGDB lookups and
+    # duration probes ahead of playback so track changes don't wait on the network or disk. Tracks arrive in play order.
+    track_queue = queue.Queue(maxsize=ART_LOOKAHEAD)
+    threading.Thread(target=prefetch_tracks, args=(config, shuffled_iter(midi_files), track_queue, duration_cache), daemon=True).start()
+
     try:
-        while current_index < len(midi_files) and not main_window_closed:
-            # --- Prepare display for current track ---
-            file_path = str(midi_files[current_index])
-            base_name = os.path.basename(file_path)
-            duration = get_duration(file_path)
-            box_art_url = None # Reset for this track
-
-            print(f"\n[{current_index + 1}/{len(midi_files)}] Preparing: {LIGHT_BLUE}{base_name}{RESET}")
-
-            # 1. Clear old info, set title, reset progress
-            display.update_display(None, base_name)
-            display.update_progress(0, duration)
-
-            # 2. *** Fetch and display box art UNCONDITIONALLY here ***
-            #    (Do this *before* potentially waiting for user input)
-            box_art_url = get_igdb_box_art(config, file_path)
-            if box_art_url:
-                display.update_display(box_art_url, base_name) # Update *with* new art if found
-
-            # 3. Set initial button state based on mode before waiting/playing
-            if continuous_play_enabled:
-                display.set_button_state("Stop") # Expecting to play immediately
-            else:
-                display.set_button_state("Play") # Expecting to wait
-
-            # 4. Update window to show the prepared state (title, art, button)
-            display.window.update()
-
-            # --- Wait for 'Play' if continuous mode is OFF ---
-            start_playback_requested = False # Reset flag
-            if not continuous_play_enabled:
-                print(" Continuous play OFF. Waiting for Play command...")
-                while not start_playback_requested and not main_window_closed:
-                    if display.window.winfo_exists(): display.window.update()
-                    else: main_window_closed = True; break
-                    time.sleep(0.1)
-
-            if main_window_closed: break
-            # If we reach here, either continuous play is ON, or Play was just pressed.
-
-            # --- Start Playback ---
-            print(f" Attempting to start: {base_name}")
-            success = display.start_playback_process(file_path)
-            if not success:
-                print(f"❌ Failed to start {base_name}. Stopping continuous play.")
-                continuous_play_enabled = False # Turn off on error
-                display.set_button_state("Play")
-                current_index += 1 # Skip failed track
-                continue # Go to next iteration
-
-            # Playback started successfully
-            display.set_button_state("Stop") # Ensure button is Stop
-
-            # *** REMOVED redundant/conditional art fetch from here ***
-
-            start_time = time.time()
-            stop_playback_requested = False # Reset stop flag for this track
-
-            # --- Monitoring Loop ---
-            # (No changes needed in the monitoring loop itself)
-            print(" Playback active. Monitoring...")
-            playback_this_song_active = True
-            while playback_this_song_active and not main_window_closed:
-                 # (Check stop_requested, process_finished, elapsed, update UI...)
-                 if stop_playback_requested: print(" Stop requested."); playback_this_song_active = False; break
-                 current_time = time.time(); elapsed = current_time - start_time
-                 process_finished = (display.process is None or display.process.poll() is not None)
-                 if process_finished or elapsed >= duration:
-                     if process_finished: print(" Process ended.")
-                     else: print(" Duration reached.")
-                     playback_this_song_active = False; break
-                 if display.window.winfo_exists(): display.update_progress(elapsed, duration); display.window.update()
-                 else: main_window_closed = True; break
-                 time.sleep(0.1)
-
-
-            # --- After Song Finishes or is Stopped ---
-            # (No changes needed in the logic here regarding art)
-            was_stopped_by_user = stop_playback_requested
-            display.stop_playback_process()
-            stop_playback_requested = False
-
-            if main_window_closed: break
-
-            if was_stopped_by_user:
-                print(" Playback stopped by user command.")
-                display.set_button_state("Play")
-                # Stay on current_index
-            else: # Song finished naturally
-                print(" Song finished naturally.")
-                current_index += 1 # Advance index
-                if current_index >= len(midi_files):
-                     # (Handle playlist end...)
-                     print("\nPlaylist finished.")
-                     continuous_play_enabled = False; display.set_button_state("Disabled")
-                     display.update_display(None, "Playlist Finished"); display.update_progress(0,0); display.time_label.configure(text="")
-                     while not main_window_closed:
-                          if display.window.winfo_exists(): display.window.update()
-                          else: main_window_closed = True
-                          time.sleep(0.1)
-                     break
-                else: # More songs left
-                    if continuous_play_enabled:
-                        print(f" Continuous play ON. Moving to track {current_index + 1}")
-                        display.set_button_state("Stop") # Ready for next track
-                    else:
-                        print(" Continuous play OFF. Ready for next track (requires Play).")
-                        display.set_button_state("Play")
-
-    # (except KeyboardInterrupt, tk.TclError, Exception...)
-    # ...
+        prepare_track()
+        display.window.mainloop()
     finally:
         # (Final cleanup...)
-        print(" Final cleanup phase...")
-        if 'display' in locals() and display and display.window.winfo_exists():
-            display.stop_playback_process(); print(" Destroying Tkinter window."); display.window.destroy()
-        cleanup_processes(); print("Exiting script.")
+        log.debug("Final cleanup phase...")
+        display.stop_playback_process()
+        if display.synth: display.synth.delete()
+        if display.window.winfo_exists():
+            log.debug("Destroying Tkinter window."); display.window.destroy()
+        cleanup_processes()
+        save_duration_cache(duration_cache); log.info("Exiting script.")
 
 if __name__ == "__main__":
+    level, levels = os.environ.get("MIDIPLAY_LOG", "INFO").upper(), logging.getLevelNamesMapping()
+    logging.basicConfig(level=levels.get(level, logging.INFO), format="%(message)s")
+    if level not in levels: log.warning("⚠️ Unknown MIDIPLAY_LOG level %r, using INFO", level)
     main()
\ No newline at end of file
@@ -6,24 +6,38 @@ import os
 import time
 from pathlib import Path
 # import mido # Not needed for this MVP
-# import requests # Keep for images
+import requests # Keep for images
+from requests.adapters import HTTPAdapter
 import tkinter as tk
-from PIL import Image, ImageTk
+from PIL import Image, ImageDraw, ImageTk
 from io import BytesIO
 import re
 import json
 import tkinter.ttk as ttk
+import queue
+import threading
 # import signal # Not needed for this MVP
 
 # --- New Imports for Visualizer ---
 import math
+import numpy as np # Magnitude buffer now, real FFT input later
 import colorsys # For HSV/HSL color manipulation
+try:
+    from numba import njit # Optional: compiles the per-bar geometry kernel below
+except ImportError:
+    njit = None
 
 # --- Constants ---
 # SOUNDFONT = "/usr/share/sounds/sf2/FluidR3_GM.sf2" # Not needed for MVP
 IGDB_API_URL = "https://api.igdb.com/v4/games"
 BOX_ART_WIDTH = 320 # Reduced size slightly for testing layout
 BOX_ART_HEIGHT = 320
+PHOTO_CACHE_SIZE = 32 # Decoded box art PhotoImages kept around by URL
+
+# One keep-alive session for the IGDB API and image CDN, so repeat fetches skip the TCP/TLS handshake
+SESSION = requests.Session()
+_adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+SESSION.mount("https://", _adapter); SESSION.mount("http://", _adapter)
 
 # --- Visualizer Constants ---
 NUM_BINS = 90          # Number of frequency bins/lines to draw
@@ -32,6 +46,7 @@ SWEEP_PERIOD_S = 5.0   # Time for the fake peak to sweep back and forth
 INNER_RADIUS_FRAC = 0.35 # Inner radius as fraction of canvas width/2
 OUTER_RADIUS_FRAC = 0.48 # Outer radius (max length) as fraction of width/2
 LINE_WIDTH = 3
+COLOR_LEVELS = 32      # Magnitude steps in the precomputed color table (invisible banding on 3px lines)
 
 
 # --- Config Loading & Setup (Keep relevant parts) ---
@@ -64,7 +79,7 @@ def get_placeholder_art(config):
      # Search for a common game like "Mario" just to get *an* image
      game_data = f'search "mario"; fields cover.url; limit 1;'
      try:
-        response = requests.post(IGDB_API_URL, headers=headers, data=game_data, timeout=5)
+        response = SESSION.post(IGDB_API_URL, headers=headers, data=game_data, timeout=5)
         response.raise_for_status()
         games = response.json()
         if games and "cover" in games[0] and games[0]["cover"]:
@@ -76,6 +91,37 @@ def get_placeholder_art(config):
      return None
 
 
+def bar_color(i, magnitude):
+    """#RRGGBB for bin i at the given magnitude (0-1): hue goes round the circle, quiet bars are dimmer."""
+    hue = i / NUM_BINS # Varies hue around the circle
+    saturation = 0.8 + magnitude * 0.2 # Slightly desaturate quiet bars?
+    value = 0.6 + magnitude * 0.4     # Dim quiet bars? Or keep bright (1.0)?
+    rgb = colorsys.hsv_to_rgb(hue, saturation, value)
+    # Convert 0-1 RGB to #RRGGBB hex format: pack into one int, format once
+    return "#%06x" % ((int(rgb[0] * 255) << 16) | (int(rgb[1] * 255) << 8) | int(rgb[2] * 255))
+
+
+# Per-frame bar math: for each lit bin, its line coords and color level, written into preallocated outputs.
+# geom rows are start_x, start_y, full-length dx, dy per bin (see GameDisplay.on_canvas_resize).
+def _bar_segments_loop(lit, mags, geom, out_xy, out_q):
+    for k in range(lit.shape[0]):
+        i = lit[k]
+        scale = min(mags[i], 1.0) # Cap magnitude at 1
+        out_xy[k, 0] = geom[0, i]; out_xy[k, 1] = geom[1, i]
+        out_xy[k, 2] = geom[0, i] + geom[2, i] * scale; out_xy[k, 3] = geom[1, i] + geom[3, i] * scale
+        out_q[k] = min(COLOR_LEVELS - 1, int(mags[i] * (COLOR_LEVELS - 1)))
+
+def _bar_segments_numpy(lit, mags, geom, out_xy, out_q):
+    n = lit.shape[0]; m = mags[lit]; scale = np.minimum(m, 1.0) # Cap magnitude at 1
+    g = geom[:, lit]
+    out_xy[:n, 0] = g[0]; out_xy[:n, 1] = g[1]
+    out_xy[:n, 2] = g[0] + g[2] * scale; out_xy[:n, 3] = g[1] + g[3] * scale
+    out_q[:n] = np.minimum(COLOR_LEVELS - 1, (m * (COLOR_LEVELS - 1)).astype(np.intp))
+
+# With numba the plain loop is compiled once (cache=True keeps it across runs); without it numpy does the same math
+bar_segments = njit(cache=True)(_bar_segments_loop) if njit else _bar_segments_numpy
+
+
 class GameDisplay:
     def __init__(self, config, on_close_callback=None): # Removed play_stop_callback
         self.window = tk.Tk()
@@ -127,12 +173,39 @@ class GameDisplay:
         self.window.protocol("WM_DELETE_WINDOW", self.on_window_close)
 
         # --- Visualizer State ---
-        self.vis_data = [0.0] * NUM_BINS
+        self._alive = True # Cleared in on_window_close, before the widgets are destroyed
+        # Per-bin magnitudes live in one preallocated array that each frame overwrites in place (no per-frame
+        # lists for the GC); _shown_mags is a copy of what's currently drawn, for the unchanged-frame check
+        self.vis_data = np.zeros(NUM_BINS, dtype=np.float32)
+        self._shown_mags = np.zeros(NUM_BINS, dtype=np.float32)
         self.vis_update_job = None
+        self._animating = False # True while a frame is being drawn
+        # The bars are drawn by Pillow into one offscreen image that is shown as a single canvas image item:
+        # Tk sees one item and one paste() per frame however many bins there are. The image itself is
+        # (re)created at canvas size by on_canvas_resize.
+        self._vis_item = self.canvas.create_image(0, 0, anchor=tk.NW)
+        self._vis_img = self._vis_draw = self._vis_photo = None
+        # Bin angles never change, so take the trig out of the per-frame draw loop
+        self._cos_table = [math.cos(i / NUM_BINS * 2 * math.pi) for i in range(NUM_BINS)]
+        self._sin_table = [math.sin(i / NUM_BINS * 2 * math.pi) for i in range(NUM_BINS)]
+        # Hue is fixed per bin and only saturation/value follow magnitude, so every color we can draw fits in
+        # a NUM_BINS x COLOR_LEVELS table of hex strings built up front
+        self._color_lut = [[bar_color(i, q / (COLOR_LEVELS - 1)) for q in range(COLOR_LEVELS)] for i in range(NUM_BINS)]
+        # Canvas size only changes on resize, so the per-bin geometry is cached by on_canvas_resize instead of
+        # asking Tk for winfo_width/height every frame
+        self._geometry_ready = False
+        self._seg_xy = np.empty((NUM_BINS, 4)) # bar_segments() output: bar coords per lit bin
+        self._seg_q = np.empty(NUM_BINS, dtype=np.intp) # ...and color level per lit bin
+        self.canvas.bind("<Configure>", self.on_canvas_resize)
 
         # --- Load Placeholder Image ---
-        placeholder_url = get_placeholder_art(config)
-        self.update_display(placeholder_url, "Visualizer Test")
+        # The IGDB lookup and image download run on a worker thread so the window and visualizer start at once;
+        # finished images come back through art_queue, which the animation loop drains every frame
+        self._photo_cache = {} # image URL -> PhotoImage, least recently used first
+        self.art_queue = queue.Queue()
+        self._art_generation = 0 # Bumped per update_display() so art arriving for an older call is dropped
+        self.update_display(None, "Visualizer Test")
+        threading.Thread(target=self._fetch_art_worker, args=(self._art_generation,), kwargs={"config": config}, daemon=True).start()
 
         # --- Start the Visualizer Animation ---
         # Schedule the first call slightly later to allow window init
@@ -140,98 +213,92 @@ class GameDisplay:
 
 
     def generate_fake_data(self):
-        """Generates a fake spectrum with a peak sweeping back and forth."""
+        """Writes a fake spectrum with a peak sweeping back and forth into self.vis_data (in place) and returns it."""
         current_time = time.time()
         # Create value oscillating between 0 and 1 over the period
         oscillation = (math.sin(current_time * 2 * math.pi / SWEEP_PERIOD_S) + 1) / 2.0
         peak_index = int(oscillation * (NUM_BINS - 1))
 
-        data = [0.0] * NUM_BINS
+        data = self.vis_data
+        data.fill(0.0)
         # Simple peak with falloff
         data[peak_index] = 1.0
         if peak_index > 0:
             data[peak_index - 1] = 0.5
         if peak_index < NUM_BINS - 1:
             data[peak_index + 1] = 0.5
-        # Maybe add tiny noise floor?
-        # data = [max(d, 0.05) for d in data]
         return data
 
 
     def update_visualizer(self):
-        """Clears canvas and redraws visualizer based on self.vis_data."""
-        self.canvas.delete("vis_line") # Clear only visualizer lines using tags
-
-        try:
-             # Get current canvas size for centering
-             canvas_width = self.canvas.winfo_width()
-             canvas_height = self.canvas.winfo_height()
-             if canvas_width < 50 or canvas_height < 50: # Avoid drawing if canvas not ready
-                 # print("DEBUG: Canvas too small, skipping draw.")
-                 return
-             center_x = canvas_width / 2
-             center_y = canvas_height / 2 # Center vertically too
-             max_dimension = min(canvas_width, canvas_height) # Base radii on smallest dimension
-             r_inner = max_dimension / 2 * INNER_RADIUS_FRAC
-             r_outer_max = max_dimension / 2 * OUTER_RADIUS_FRAC
-             length_scale = r_outer_max - r_inner # Max length of a bar
-        except tk.TclError: # Handle cases where widget might be destroyed during update
-             # print("DEBUG: TclError getting canvas size.")
-             return
-        except Exception as e: # Catch other potential errors during calculation
-             print(f"DEBUG: Error during size/radii calculation: {e}")
-             return
-
-        # --- Loop through data and draw lines ---
-        for i, magnitude in enumerate(self.vis_data):
-            if magnitude < 0.01: # Don't draw tiny lines
-                 continue
-
-            try:
-                # Angle sweeps from 0 (right) counter-clockwise
-                angle = (i / NUM_BINS) * 2 * math.pi
-
-                # Calculate start and end points
-                start_x = center_x + r_inner * math.cos(angle)
-                start_y = center_y + r_inner * math.sin(angle)
-                current_length = length_scale * min(magnitude, 1.0) # Cap magnitude at 1
-                end_x = center_x + (r_inner + current_length) * math.cos(angle)
-                end_y = center_y + (r_inner + current_length) * math.sin(angle)
-
-                # Calculate color (HSV -> RGB)
-                hue = i / NUM_BINS # Varies hue around the circle
-                saturation = 0.8 + magnitude * 0.2 # Slightly desaturate quiet bars?
-                value = 0.6 + magnitude * 0.4     # Dim quiet bars? Or keep bright (1.0)?
-                rgb = colorsys.hsv_to_rgb(hue, saturation, value)
-                # Convert 0-1 RGB to #RRGGBB hex format
-                color_hex = "#{:02x}{:02x}{:02x}".format(
-                    int(rgb[0] * 255), int(rgb[1] * 255), int(rgb[2] * 255)
-                )
-
-                # --- Check coordinates before drawing ---
-                coords = (start_x, start_y, end_x, end_y)
-                if not all(isinstance(c, (int, float)) and math.isfinite(c) for c in coords):
-                     # print(f"DEBUG: Invalid coords for bin {i}: {coords}")
-                     continue # Skip drawing this line
-
-                # --- Draw the actual line ---
-                self.canvas.create_line(
-                    coords, # Pass coordinates as a tuple or list
-                    fill=color_hex,
-                    width=LINE_WIDTH,
-                    tags="vis_line" # Use tag for easy clearing
-                )
-            except Exception as e:
-                 print(f"DEBUG: Error drawing line for bin {i}: {e}")
-                 # Continue to next bin if one line fails
+        """Repaints the visualizer image based on self.vis_data."""
+        if not self._alive: return # Window is being torn down; the canvas may already be gone
+        if not self._geometry_ready: return # Canvas not laid out yet (or too small to draw in)
+
+        # Coords come straight from finite geometry and table values, so there's nothing to validate per bar
+        draw = self._vis_draw
+        draw.rectangle((0, 0) + self._vis_img.size, fill=self.canvas_bg) # Clear last frame's bars
+        lit = np.flatnonzero(self.vis_data > 0.01) # Don't draw tiny lines; one vectorized pass picks the bins
+        # Start points and full-length bar vectors are cached per resize; the kernel scales them by magnitude
+        bar_segments(lit, self.vis_data, self._geom, self._seg_xy, self._seg_q)
+        n = len(lit)
+        for i, coords, level in zip(lit.tolist(), self._seg_xy[:n].tolist(), self._seg_q[:n].tolist()):
+            draw.line(coords, fill=self._color_lut[i][level], width=LINE_WIDTH) # Color from the precomputed table
+        self._vis_photo.paste(self._vis_img) # The frame's only Tk call
+
+    def on_canvas_resize(self, event):
+        """<Configure> handler: recomputes everything that depends on the canvas size, once per resize."""
+        canvas_width, canvas_height = event.width, event.height
+        self._geometry_ready = canvas_width >= 50 and canvas_height >= 50 # Avoid drawing if canvas not ready
+        center_x = canvas_width / 2
+        center_y = canvas_height / 2 # Center vertically too
+        max_dimension = min(canvas_width, canvas_height) # Base radii on smallest dimension
+        r_inner = max_dimension / 2 * INNER_RADIUS_FRAC
+        r_outer_max = max_dimension / 2 * OUTER_RADIUS_FRAC
+        length_scale = r_outer_max - r_inner # Max length of a bar
+        # Angle sweeps from 0 (right) counter-clockwise
+        cos_t = np.array(self._cos_table); sin_t = np.array(self._sin_table)
+        self._geom = np.array([center_x + r_inner * cos_t, center_y + r_inner * sin_t, length_scale * cos_t, length_scale * sin_t])
+        if self._geometry_ready:
+            self._vis_img = Image.new("RGB", (canvas_width, canvas_height), self.canvas_bg)
+            self._vis_draw = ImageDraw.Draw(self._vis_img)
+            self._vis_photo = ImageTk.PhotoImage(self._vis_img)
+            self.canvas.itemconfig(self._vis_item, image=self._vis_photo)
+        else:
+            self.canvas.itemconfig(self._vis_item, image="")
+        self.update_visualizer() # Unchanged data skips the per-frame redraw, so redraw at the new size here
 
     def animate_visualizer(self):
         """Generates new data and schedules the next update."""
+        # One chain only: a nested call (e.g. from an event handled mid-frame) is dropped outright
+        if not self._alive or self._animating: return
+        self._animating = True
+        try: self._draw_frame()
+        finally: self._animating = False
+        # A job still pending means we were entered out of turn: replace it rather than adding a second chain
+        # (the timer path clears it first, so normal frames make no after_cancel round trip)
+        if self.vis_update_job: self.window.after_cancel(self.vis_update_job)
+        # Schedule the next call against the wall clock: the delay shrinks by however long this frame took,
+        # and if we've fallen more than a frame behind we drop the missed frames instead of bunching them up
+        now = time.perf_counter()
+        self._next_frame_t += UPDATE_MS / 1000
+        if now - self._next_frame_t > UPDATE_MS / 1000: self._next_frame_t = now + UPDATE_MS / 1000
+        delay_ms = max(1, int((self._next_frame_t - now) * 1000))
+        self.vis_update_job = self.window.after(delay_ms, self._on_frame_timer)
+
+    def _on_frame_timer(self):
+        self.vis_update_job = None # This job has fired; nothing left to cancel
+        self.animate_visualizer()
+
+    def _draw_frame(self):
         # print(f"DEBUG: animate_visualizer called at {time.time()}") # Add this
-        self.vis_data = self.generate_fake_data()
-        self.update_visualizer()
-        # Schedule the next call
-        self.vis_update_job = self.window.after(UPDATE_MS, self.animate_visualizer)
+        self.drain_art_queue()
+        self.generate_fake_data()
+        if not np.array_equal(self.vis_data, self._shown_mags): # Same bars as last frame (e.g. the sweep lingering at an end): nothing to redraw
+            np.copyto(self._shown_mags, self.vis_data)
+            self.update_visualizer()
+            # The frame's image is pasted by now; flush the canvas repaint in one go
+            self.canvas.update_idletasks()
 
     def start_visualizer_loop(self):
         print("Starting visualizer animation loop...")
@@ -240,32 +307,57 @@ class GameDisplay:
             self.window.after_cancel(self.vis_update_job)
             self.vis_update_job = None
         # Start the loop
+        self._next_frame_t = time.perf_counter() # Target time of the frame being drawn
         self.animate_visualizer()
 
 
     def update_display(self, image_url, title):
-        """Loads image (if URL provided) and sets title."""
+        """Sets title now; the image (if URL provided) is fetched and decoded off the Tk thread, then shown."""
         self.title_label.configure(text=title or "---")
+        self._art_generation += 1 # Any fetch still in flight for an earlier call is now stale
+        if image_url and image_url not in self._photo_cache:
+            threading.Thread(target=self._fetch_art_worker, args=(self._art_generation, image_url), daemon=True).start()
+        else:
+            self._install_photo(image_url, None)
+
+    def _fetch_art_worker(self, generation, image_url=None, config=None):
+        """Worker thread: resolves the URL if needed, downloads and decodes the art, and queues it for the Tk thread."""
         try:
-            if image_url:
-                # Basic image loading from URL (replace with your more robust version if needed)
-                response = requests.get(image_url, timeout=10); response.raise_for_status()
-                img_data = response.content
-                img = Image.open(BytesIO(img_data))
-                img.thumbnail((BOX_ART_WIDTH, BOX_ART_HEIGHT)) # Use constants
-                photo = ImageTk.PhotoImage(img)
-                self.image_label.configure(image=photo)
-                self.image_label.image = photo
-            else:
-                self.image_label.configure(image="")
-                self.image_label.image = None
+            if image_url is None: image_url = get_placeholder_art(config)
+            if not image_url: return
+            # Basic image loading from URL (replace with your more robust version if needed)
+            response = SESSION.get(image_url, timeout=10); response.raise_for_status()
+            img_data = response.content
+            img = Image.open(BytesIO(img_data))
+            # Before anything loads the pixels: lets libjpeg decode at 1/2..1/8 scale (no-op for PNGs)
+            img.draft("RGB", (BOX_ART_WIDTH, BOX_ART_HEIGHT))
+            # NEAREST: draft() has already done the heavy shrinking, so the cheapest filter finishes it off
+            img.thumbnail((BOX_ART_WIDTH, BOX_ART_HEIGHT), Image.Resampling.NEAREST) # Use constants
+            self.art_queue.put((generation, image_url, img))
         except Exception as e:
             print(f"⚠️ Img Load Error: {e}")
-            self.image_label.configure(image=""); self.image_label.image = None
+
+    def drain_art_queue(self):
+        """Installs any art the worker threads finished since the last frame (Tk calls stay on this thread)."""
+        while True:
+            try: generation, image_url, img = self.art_queue.get_nowait()
+            except queue.Empty: return
+            if generation != self._art_generation: continue # update_display() was called again while this loaded
+            self._install_photo(image_url, img)
+
+    def _install_photo(self, image_url, img):
+        """Shows the cached PhotoImage for image_url, or wraps the freshly decoded img; clears the image if neither."""
+        photo = self._photo_cache.pop(image_url, None) if image_url else None # Re-inserted below, so the dict stays in LRU order
+        if photo is None and img is not None: photo = ImageTk.PhotoImage(img)
+        if photo is not None:
+            self._photo_cache[image_url] = photo
+            if len(self._photo_cache) > PHOTO_CACHE_SIZE: del self._photo_cache[next(iter(self._photo_cache))]
+        self.image_label.configure(image=photo or ""); self.image_label.image = photo
 
 
     def on_window_close(self):
         print("🚪 Window close requested...")
+        self._alive = False # Checked by the visualizer instead of catching TclError on every frame
         # Stop the visualizer loop
         if self.vis_update_job:
             self.window.after_cancel(self.vis_update_job)